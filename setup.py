@@ -62,5 +62,6 @@ if __name__ == "__main__":
             [console_scripts]
             make_specs=vivarium_conic_calcium_supplementation.tools.cli:make_specs
             build_calcium_artifact=vivarium_conic_calcium_supplementation.tools.cli:build_calcium_artifact
+            verify_calcium_artifact=vivarium_conic_calcium_supplementation.tools.cli:verify_calcium_artifact
         '''
     )
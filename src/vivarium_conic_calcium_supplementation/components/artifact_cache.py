@@ -0,0 +1,272 @@
+"""Node local cache of artifact data for concurrent simulations.
+
+Every simulation that loads data from the artifact through
+``builder.data.load`` goes through the artifact manager. The
+:class:`CachedArtifactManager` here replaces the default manager. With
+``input_data.cache_dir`` set, the first process on a node to load a key
+writes the filtered data to the cache as one ``.npy`` file per column.
+Every later process with the same artifact, location and draw reads those
+files instead of querying and decompressing the hdf tables, which are
+stored row-wise with every draw, so setup is faster.
+
+This is a setup time cache only. The artifact manager and lookup tables
+rebuild the data as private ``pandas`` objects, so each process still holds
+its own copy and per process memory does not drop.
+
+Entries are keyed on the artifact file's path, size and modification time
+along with the draw, location and filter term, so a rebuilt artifact never
+serves stale data. Entries unused for ``input_data.cache_max_age_days`` are
+removed when a simulation sets up, as are leftovers of crashed fills.
+Data that cannot be stored without loss is always read from the artifact,
+as is any key whose cache entry cannot be written or read, e.g. because the
+cache directory is full or not writable.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from vivarium.framework.artifact import ArtifactManager
+
+LAST_USED = '.last_used'
+
+class CachedArtifactManager(ArtifactManager):
+    """Artifact manager that serves data from a node local file cache.
+
+    The cache is off unless ``input_data.cache_dir`` is set.
+    """
+
+    configuration_defaults = {
+        'input_data': {
+            **ArtifactManager.configuration_defaults['input_data'],
+            'cache_dir': None,
+            'cache_max_age_days': 7,
+        }
+    }
+
+    def setup(self, builder):
+        super().setup(builder)
+        input_data = builder.configuration.input_data
+        if input_data.cache_dir is not None and self.artifact is not None:
+            cache_dir = Path(input_data.cache_dir)
+            fingerprint = get_fingerprint(self.artifact.path, input_data.input_draw_number,
+                                          input_data.location, input_data.artifact_filter_term)
+            try:
+                self.artifact = ArtifactCache(self.artifact, cache_dir / fingerprint)
+                evict(cache_dir, max_age=input_data.cache_max_age_days * 24 * 60 * 60, keep=fingerprint)
+            except OSError as e:
+                logger.warning(f'Artifact cache at {cache_dir} is unavailable, reading from the artifact: {e}')
+
+
+class ArtifactCache:
+    """View of an artifact that reads through a file cache.
+
+    Parameters
+    ----------
+    artifact
+        The filtered artifact to fill the cache from.
+    root
+        Directory holding the cache entries for this artifact and filter.
+
+    """
+
+    def __init__(self, artifact, root: Path):
+        self.artifact = artifact
+        self.root = root
+        self._mark_used()
+        remove_abandoned_fills(self.root)
+
+    def __getattr__(self, name):
+        return getattr(self.artifact, name)
+
+    def __contains__(self, entity_key: str) -> bool:
+        return entity_key in self.artifact
+
+    def load(self, entity_key: str) -> Any:
+        entry = self.root / str(entity_key)
+        try:
+            if not entry.exists():
+                self._fill(str(entity_key), entry)
+            data = attach(entry)
+        except OSError as e:
+            logger.warning(f'Could not use the artifact cache for {entity_key}, reading from the artifact: {e}')
+            data = None
+        return self.artifact.load(entity_key) if data is None else data
+
+    def _mark_used(self, attempts: int = 3):
+        # The marker is touched under the root's lock, so eviction, which
+        # holds the same lock, cannot remove the root while it is updated.
+        for attempt in range(attempts):
+            self.root.mkdir(parents=True, exist_ok=True)
+            try:
+                with lock(self.root):
+                    (self.root / LAST_USED).touch()
+                return
+            except FileNotFoundError:
+                # Evicted between creating the root and taking its lock.
+                if attempt == attempts - 1:
+                    raise
+
+    def _fill(self, entity_key: str, entry: Path):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with lock(self.root):
+            # Another process may have filled the entry while we waited.
+            if not entry.exists():
+                staging = self.root / f'{entity_key}.{os.getpid()}.tmp'
+                shutil.rmtree(staging, ignore_errors=True)
+                try:
+                    write(self.artifact.load(entity_key), staging)
+                    staging.rename(entry)
+                finally:
+                    shutil.rmtree(staging, ignore_errors=True)
+                    self.artifact.clear_cache()
+
+
+def get_fingerprint(artifact_path, draw, location, filter_term) -> str:
+    stat = Path(artifact_path).stat()
+    identity = [str(Path(artifact_path).resolve()), stat.st_size, stat.st_mtime_ns, draw, location, filter_term]
+    return hashlib.sha256(json.dumps(identity, default=str).encode()).hexdigest()[:16]
+
+
+@contextmanager
+def lock(root: Path, blocking: bool = True):
+    """Holds an exclusive lock on a cache root, shared by all processes on the node."""
+    with (root / '.lock').open('w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        yield
+
+
+def evict(cache_dir: Path, max_age: float, keep: str):
+    """Removes cache roots that have not been used for ``max_age`` seconds.
+
+    A root without a last used marker is judged by its own age, since it may
+    be in the middle of being created by another process.
+    """
+    for root in cache_dir.iterdir():
+        if root.name == keep or not root.is_dir():
+            continue
+        try:
+            # Taking the lock can create the lock file, which updates the root's mtime.
+            created = root.stat().st_mtime
+            with lock(root, blocking=False):
+                last_used = root / LAST_USED
+                used = last_used.stat().st_mtime if last_used.exists() else created
+                if time.time() - used > max_age:
+                    shutil.rmtree(root, ignore_errors=True)
+        except OSError:
+            # In use by a filling process, or already removed by another one.
+            continue
+
+
+def remove_abandoned_fills(root: Path):
+    """Removes staging directories left behind by processes that died mid fill."""
+    for staging in root.glob('*.tmp'):
+        pid = staging.name.rsplit('.', 2)[-2]
+        if not pid.isdigit() or not _is_running(int(pid)):
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write(data: Any, entry: Path):
+    """Writes artifact data to a cache entry directory.
+
+    Data that does not survive the round trip unchanged is recorded as
+    uncached, so it is read from the artifact instead.
+    """
+    entry.mkdir(parents=True)
+    try:
+        if not isinstance(data, pd.DataFrame):
+            metadata = {'kind': 'json'}
+            with (entry / 'value.json').open('w') as f:
+                json.dump(data, f)
+        else:
+            metadata = _write_frame(data, entry)
+        metadata = json.dumps(metadata)
+    except (TypeError, ValueError):
+        metadata = json.dumps({'kind': 'uncached'})
+    (entry / 'metadata.json').write_text(metadata)
+
+    cached = attach(entry)
+    if cached is not None and not _same(data, cached):
+        (entry / 'metadata.json').write_text(json.dumps({'kind': 'uncached'}))
+
+
+def _write_frame(data: pd.DataFrame, entry: Path) -> dict:
+    frame = data.reset_index()
+    metadata = {'kind': 'frame',
+                'index_columns': [str(c) for c in frame.columns[:data.index.nlevels]],
+                'index_names': list(data.index.names),
+                'columns': [],
+                'dtypes': [],
+                'categories': {}}
+    for i, (column, values) in enumerate(frame.items()):
+        dtype = values.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            array = values.cat.codes.values
+            metadata['categories'][str(i)] = {'categories': values.cat.categories.tolist(),
+                                              'ordered': bool(dtype.ordered)}
+        elif dtype.kind in 'biufcmM':
+            array = values.values
+        elif pd.api.types.infer_dtype(values, skipna=False) == 'string':
+            # Fixed width unicode can be stored without pickling.
+            array = np.asarray(values, dtype=str)
+        else:
+            return {'kind': 'uncached'}
+        np.save(entry / f'{i}.npy', array, allow_pickle=False)
+        metadata['columns'].append(str(column))
+        metadata['dtypes'].append(str(dtype))
+    return metadata
+
+
+def attach(entry: Path) -> Optional[Any]:
+    """Reads a cache entry, or returns ``None`` if the key is uncached."""
+    with (entry / 'metadata.json').open() as f:
+        metadata = json.load(f)
+
+    if metadata['kind'] == 'uncached':
+        return None
+    if metadata['kind'] == 'json':
+        with (entry / 'value.json').open() as f:
+            return json.load(f)
+
+    columns = {}
+    for i, column in enumerate(metadata['columns']):
+        array = np.load(entry / f'{i}.npy', mmap_mode='r')
+        if str(i) in metadata['categories']:
+            category = metadata['categories'][str(i)]
+            array = pd.Categorical.from_codes(array, category['categories'], ordered=category['ordered'])
+        elif array.dtype.kind == 'U':
+            array = array.astype(object)
+        columns[column] = array
+    data = pd.DataFrame(columns, columns=metadata['columns'])
+    data = data.set_index(metadata['index_columns'])
+    data.index.names = metadata['index_names']
+    return data
+
+
+def _same(data: Any, cached: Any) -> bool:
+    if isinstance(data, pd.DataFrame):
+        return (isinstance(cached, pd.DataFrame)
+                and data.equals(cached)
+                and list(data.columns) == list(cached.columns)
+                and list(data.index.names) == list(cached.index.names)
+                and list(data.dtypes) == list(cached.dtypes))
+    return type(data) == type(cached) and data == cached
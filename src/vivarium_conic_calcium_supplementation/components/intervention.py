@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 import scipy.stats
 
+from vivarium.framework.randomness import RandomnessStream
+
 
 class CalciumSupplementationIntervention:
 
@@ -125,19 +127,12 @@ class CalciumSupplementationIntervention:
         return anc1_coverage
 
     def get_population_effect_size(self, mean, sd, key):
-        r = np.random.RandomState(self.effect_randomness.get_seed(additional_key=key))
-        draw = r.uniform()
-        effect = scipy.stats.norm(mean, sd).ppf(draw)
-        effect = effect if effect > 0.0 else 0.0 # NOTE: Not allowing negative effect
-        return effect
+        seed = self.effect_randomness.get_seed(additional_key=key)
+        return sample_population_effect_sizes([seed], mean, sd).item()
 
     def get_individual_effect_size(self, index, mean, sd, key):
         draw = self.effect_randomness.get_draw(index, additional_key=key)
-        if sd > 0:
-            effect_size = scipy.stats.norm(mean, sd).ppf(draw)
-            effect_size[effect_size < 0] = 0.0  # NOTE: Not allowing negative effect
-        else:
-            effect_size = mean    
+        effect_size = sample_individual_effect_sizes(draw.values, mean, sd)
         return pd.Series(effect_size, index=index)
 
     def adjust_lbwsg(self, index, exposure):
@@ -159,16 +154,98 @@ class CalciumSupplementationIntervention:
         return exposure + self.config.underweight_shift * (pop.calcium_supplementation_treatment_status == 'treated')
 
 
-def validate_configuration(config):
-    if not (0 <= config['proportion'] <= 1):
-        raise ValueError(f'The proportion for calcium supplementation intervention must be between 0 and 1.'
-                         f'You specified {config.proportion}.')
-
-    for key in ['stunting_shift', 'wasting_shift', 'underweight_shift']:
-        if config[key] < 0:
-            raise ValueError(f'Additive shift for {key} must be positive.')
-
-    for key in ['birth_weight_shift', 'gestation_time_shift']:
-        for level, measure in [('population', 'mean'), ('population', 'sd'), ('individual', 'sd')]:
-            if config[key][level][measure] < 0:
-                raise ValueError(f"The {level} {measure} of {key} must be positive.")
+def get_population_effect_seeds(key, start_time, random_seed, input_draws):
+    """Derives the ``effect_draw`` stream seeds used for population effects.
+
+    Reproduces ``RandomnessStream.get_seed`` as called in the component's
+    setup for each input draw, with the stream seeded the way psimulate
+    configures it (the input draw is the ``randomness.additional_seed``).
+
+    Parameters
+    ----------
+    key
+        The additional key of the effect, e.g. ``'population_birth_weight'``.
+    start_time
+        The simulation start time, which is the clock time during setup.
+    random_seed
+        The ``randomness.random_seed`` of the runs.
+    input_draws
+        Sequence of input draw numbers.
+
+    Returns
+    -------
+        A list of seeds, one per input draw.
+    """
+    return [RandomnessStream('effect_draw', lambda: start_time, f'{random_seed}{draw}').get_seed(additional_key=key)
+            for draw in input_draws]
+
+
+def sample_population_effect_sizes(seeds, means, sds):
+    """Samples population level effect sizes for a batch of seeds and parameter sets.
+
+    Parameters
+    ----------
+    seeds
+        Sequence of seeds, as returned by ``RandomnessStream.get_seed``
+        or :func:`get_population_effect_seeds`.
+    means, sds
+        Scalars or 1-d arrays of candidate population means and standard
+        deviations.
+
+    Returns
+    -------
+        An array of shape (len(seeds), number of parameter sets).
+    """
+    draws = np.array([np.random.RandomState(seed).uniform() for seed in seeds])
+    draws, means, sds = np.broadcast_arrays(draws[:, np.newaxis],
+                                            np.atleast_1d(np.asarray(means, dtype=float)),
+                                            np.atleast_1d(np.asarray(sds, dtype=float)))
+    # A normal distribution without positive sd is undefined, so its effect is zero.
+    effect = np.zeros(draws.shape)
+    has_spread = sds > 0
+    effect[has_spread] = scipy.stats.norm.ppf(draws[has_spread], loc=means[has_spread], scale=sds[has_spread])
+    effect[~(effect > 0.0)] = 0.0  # NOTE: Not allowing negative effect
+    return effect
+
+
+def sample_individual_effect_sizes(draws, population_effects, sd):
+    """Samples individual level effect sizes around population level effects.
+
+    Parameters
+    ----------
+    draws
+        Simulant level uniform draws, as returned by
+        ``RandomnessStream.get_draw``. Either a 1-d array shared by every
+        population effect, or an array of shape
+        (number of input draws, number of simulants) whose rows line up
+        with the first axis of ``population_effects``.
+    population_effects
+        Scalar or array of population level effect sizes. With 2-d
+        ``draws`` its first axis is the input draw.
+    sd
+        Individual level standard deviation, broadcastable against
+        ``population_effects``. Where it is zero every simulant gets
+        the population effect.
+
+    Returns
+    -------
+        An array of shape ``population_effects.shape + (number of simulants,)``.
+    """
+    population_effects, sd = np.broadcast_arrays(np.asarray(population_effects, dtype=float),
+                                                 np.asarray(sd, dtype=float))
+    draws = np.asarray(draws, dtype=float)
+    if draws.ndim == 2:
+        if population_effects.ndim == 0 or population_effects.shape[0] != draws.shape[0]:
+            raise ValueError(f'Draws for {draws.shape[0]} input draws do not line up with population '
+                             f'effects of shape {population_effects.shape}.')
+        # Put each input draw's simulant draws against its own population effects.
+        draws = draws.reshape(draws.shape[:1] + (1,) * (population_effects.ndim - 1) + draws.shape[1:])
+    elif draws.ndim != 1:
+        raise ValueError(f'Draws must be 1-d or (input draws, simulants), not of shape {draws.shape}.')
+    draws, mean, sd = np.broadcast_arrays(draws, population_effects[..., np.newaxis], sd[..., np.newaxis])
+    effect = mean.copy()
+    has_spread = sd > 0
+    spread_effect = scipy.stats.norm.ppf(draws[has_spread], loc=mean[has_spread], scale=sd[has_spread])
+    spread_effect[spread_effect < 0] = 0.0  # NOTE: Not allowing negative effect
+    effect[has_spread] = spread_effect
+    return effect
@@ -87,4 +87,10 @@ class SampleHistoryObserver:
 
     def dump(self, event):
         sample_history = pd.concat(self.history_snapshots, axis=0)
-        sample_history.to_hdf(self.sample_history_parameters.path, key='histories')
+        # Written as a queryable table indexed on simulant and time so that
+        # row slices can be selected without reading the whole history.
+        # See verification_and_validation/sample_history.py.
+        with pd.HDFStore(self.sample_history_parameters.path, mode='a', complevel=9) as store:
+            store.put('histories', sample_history, format='table',
+                      data_columns=['calcium_supplementation_treatment_status'])
+            store.create_table_index('histories', columns=['simulant', 'time'], optlevel=9, kind='full')
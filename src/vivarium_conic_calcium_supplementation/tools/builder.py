@@ -1,42 +1,32 @@
 import itertools
 from functools import partial
 from pathlib import Path
-from typing import Sequence, Mapping
+from typing import Sequence, Mapping, Dict
 
 import pandas as pd
 from loguru import logger
 
 from vivarium.framework.artifact import EntityKey, get_location_term, Artifact
+import vivarium_inputs
 from vivarium_inputs.data_artifact.loaders import loader
 
+from vivarium_conic_calcium_supplementation.tools import manifest as mf
+
+
+SOURCE_VERSION = f'vivarium_inputs=={vivarium_inputs.__version__}'
+
+
+def safe_write(artifact: Artifact, keys: Sequence, getters: Mapping, source_version: str = SOURCE_VERSION):
+    mf.write_keys(artifact, keys, getters, source_version)
+
+
+def safe_write_by_draw(artifact: Artifact, keys: Sequence, getters: Mapping, source_version: str = SOURCE_VERSION):
+    mf.write_keys_by_draw(artifact, keys, getters, source_version)
+
+
+def get_artifact_path(location: str, output_dir: str) -> Path:
+    return Path(output_dir) / f'{location.replace(" ", "_").lower()}.hdf'
 
-def safe_write(artifact: Artifact, keys: Sequence, getters: Mapping):
-    for key in keys:
-        if str(key) not in artifact:
-            logger.info(f'>>> writing {key}.')
-            data = getters[key]()
-            artifact.write(key, data)
-        else:
-            logger.info(f'{key} found in artifact.')
-
-
-def safe_write_by_draw(path, keys, getters):
-    for key in keys:
-        logger.info(f'looking for {key} draw-level data.')
-        data = getters[key]()
-        draws_written = []
-        with pd.HDFStore(path, complevel=9, mode='a') as store:
-            store.put(f'{key.path}/index', data.index.to_frame(index=False))
-            data = data.reset_index(drop=True)
-            for c in data.columns:
-                draw_key = f'{key.path}/{c}'
-                if draw_key not in store:
-                    store.put(draw_key, data[c])
-                    draws_written.append(c)
-        if draws_written:
-            logger.info(f">>> wrote data for draws [{' '.join(draws_written)}] under {key}.")
-        else:
-            logger.info(f"all draws found for {key}.")
 
 def create_new_artifact(path: str, location: str) -> Artifact:
     logger.info(f"Creating artifact at {path}.")
@@ -126,29 +116,32 @@ def write_lbwsg_data(artifact, location):
         data_source = Path('/share/costeffectiveness/lbwsg/artifacts') / f"{location.replace(' ', '_')}.hdf"
         reversioned_artifact = Artifact(data_source)
         getters = {k: partial(reversioned_artifact.load, str(k)) for k in keys}
+        source_version = f'{data_source}@{pd.Timestamp(data_source.stat().st_mtime, unit="s").isoformat()}'
     else:
         getters = {k: partial(loader, k, location, set()) for k in keys}
-
-    # these measures are not tables dependent
-    metadata_measures = ['categories', 'distribution']
-    metadata_keys = [EntityKey(f'risk_factor.{risk}.{m}') for m in metadata_measures]
-    metadata_getters = {k: partial(loader, k, location, set()) for k in metadata_keys}
-    keys.extend(metadata_keys)
-    getters.update(metadata_getters)
+        source_version = SOURCE_VERSION
 
     # relative risk is written by draw to save space
     rr_key = EntityKey(f'risk_factor.{risk}.relative_risk')
     keys.remove(rr_key)
 
-    safe_write(artifact, keys, getters)
-    safe_write_by_draw(artifact.path, [rr_key], {rr_key: getters.pop(rr_key)})
+    safe_write(artifact, keys, getters, source_version)
+    safe_write_by_draw(artifact, [rr_key], {rr_key: getters.pop(rr_key)}, source_version)
+
+    # these measures are not tables dependent
+    metadata_measures = ['categories', 'distribution']
+    metadata_keys = [EntityKey(f'risk_factor.{risk}.{m}') for m in metadata_measures]
+    metadata_getters = {k: partial(loader, k, location, set()) for k in metadata_keys}
+    safe_write(artifact, metadata_keys, metadata_getters)
 
 
-def build_artifact(location: str, output_dir: str, erase: bool):
+def build_artifact(location: str, output_dir: str, erase: bool, full: bool = False):
 
-    artifact_path = Path(output_dir) / f'{location.replace(" ", "_").lower()}.hdf'
+    artifact_path = get_artifact_path(location, output_dir)
     if erase and artifact_path.is_file():
         artifact_path.unlink()
+    if full and artifact_path.is_file():
+        mark_stale_keys(artifact_path)
     artifact = create_new_artifact(artifact_path, location)
     write_demographic_data(artifact, location)
     write_covariate_data(artifact, location)
@@ -157,3 +150,23 @@ def build_artifact(location: str, output_dir: str, erase: bool):
     write_lbwsg_data(artifact, location)
 
     logger.info('!!! Done !!!')
+
+
+def mark_stale_keys(artifact_path: Path):
+    logger.info(f"Checking content hashes in {artifact_path}.")
+
+    stale = mf.mark_mismatched_stale(str(artifact_path))
+    for key, problem in stale.items():
+        logger.info(f'{key} will be pulled again: {problem}.')
+
+
+def verify_artifact(location: str, output_dir: str, full: bool) -> Dict[str, str]:
+    artifact_path = get_artifact_path(location, output_dir)
+    logger.info(f"Verifying artifact at {artifact_path}.")
+
+    problems = mf.verify_artifact(str(artifact_path), full)
+    for key, problem in problems.items():
+        logger.error(f'{key}: {problem}.')
+    if not problems:
+        logger.info('All keys match the manifest.')
+    return problems
@@ -182,8 +182,40 @@ def make_specs(template: str, locations_file: str, single_location: str, output_
               default=False,
               type=click.BOOL,
               help='Erase artifact if it exists.')
-def build_calcium_artifact(location: str, output_dir: str, erase: bool) -> None:
+@click.option('-f', '--full',
+              is_flag=True,
+              help='Also pull keys whose content hash does not match the manifest, and adopted keys. This is slow.')
+def build_calcium_artifact(location: str, output_dir: str, erase: bool, full: bool) -> None:
     """Build an artifact for the provided location
+
+    Only keys that are missing, have the wrong number of rows or were pulled
+    with an older source version are pulled again. Keys in an artifact built
+    before the manifest existed are adopted by hashing the stored data once,
+    which reads every table but pulls nothing. With ``--full`` every key is
+    loaded and hashed first, and keys whose content changed or that were
+    adopted are pulled again. Replaced keys leave unused space in the hdf
+    file; run ``ptrepack`` on the artifact after a large rebuild to reclaim it.
     """
     main = handle_exceptions(builder.build_artifact, logger, with_debugger=True)
-    main(location, output_dir, erase)
+    main(location, output_dir, erase, full)
+
+
+@click.command()
+@click.option('-l', '--location',
+              required=True,
+              help='The location whose artifact should be verified')
+@click.option('-o', '--output-dir',
+              default=str(paths.ARTIFACT_ROOT),
+              show_default=True,
+              type=click.Path(exists=True, dir_okay=True),
+              help='The directory containing the artifact.')
+@click.option('-f', '--full',
+              is_flag=True,
+              help='Also load every key and compare content hashes. This is slow.')
+def verify_calcium_artifact(location: str, output_dir: str, full: bool) -> None:
+    """Check the artifact for the provided location against its manifest
+    """
+    main = handle_exceptions(builder.verify_artifact, logger, with_debugger=False)
+    problems = main(location, output_dir, full)
+    if problems:
+        raise click.ClickException(f'{len(problems)} key(s) do not match the artifact manifest.')
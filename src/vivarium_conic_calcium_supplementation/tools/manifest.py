@@ -0,0 +1,343 @@
+"""Content manifest for incrementally built artifacts.
+
+The manifest is stored inside the artifact under ``metadata.manifest``. For
+each key written by the builder it records a hash of the data, its shape,
+the version of the source the data was pulled from and when it was written.
+The builder uses it to decide which keys need to be pulled again, and
+:func:`verify_artifact` uses it to check an artifact without loading
+the full tables.
+
+Keys found in an artifact built before the manifest existed are adopted:
+they are hashed from the stored data, without pulling, and assumed to come
+from the current source version.
+
+The row count checks made on every build cannot see corrupt data that kept
+its shape. :func:`mark_stale` flags keys so the next build pulls them again
+whatever their state; the builder's full mode uses it for keys whose content
+hash no longer matches and for adopted keys, through
+:func:`mark_mismatched_stale`.
+
+HDF5 does not reclaim the space of removed nodes, so every replaced key and
+every manifest update grows the file. Run ``ptrepack`` on an artifact after
+a large rebuild to compact it.
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from vivarium.framework.artifact import EntityKey, Artifact
+
+
+MANIFEST_KEY = EntityKey('metadata.manifest')
+
+
+def hash_data(data: Any) -> str:
+    """Hashes artifact data, including its index and column labels."""
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        labels = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        content = pd.util.hash_pandas_object(data, index=True).values.tobytes()
+        content += json.dumps([str(l) for l in labels + list(data.index.names)]).encode()
+    else:
+        content = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.sha256(content).hexdigest()
+
+
+def make_entry(data: Any, source_version: str, **extra) -> Dict:
+    """Builds the manifest entry describing ``data``."""
+    shape = list(data.shape) if isinstance(data, (pd.DataFrame, pd.Series)) else None
+    return {'hash': hash_data(data),
+            'shape': shape,
+            'source_version': source_version,
+            'timestamp': pd.Timestamp.now().isoformat(),
+            **extra}
+
+
+def load_manifest(artifact: Artifact) -> Dict[str, Dict]:
+    if str(MANIFEST_KEY) in artifact:
+        return dict(artifact.load(str(MANIFEST_KEY)))
+    return {}
+
+
+def save_manifest(artifact: Artifact, manifest: Mapping[str, Dict]):
+    if str(MANIFEST_KEY) in artifact:
+        artifact.replace(str(MANIFEST_KEY), dict(manifest))
+    else:
+        artifact.write(str(MANIFEST_KEY), dict(manifest))
+
+
+def mark_stale(artifact: Artifact, keys: Sequence[str]):
+    """Flags manifest entries so the next build pulls their keys again."""
+    manifest = load_manifest(artifact)
+    stale = [str(k) for k in keys if str(k) in manifest]
+    for key in stale:
+        manifest[key] = {**manifest[key], 'stale': True}
+    if stale:
+        save_manifest(artifact, manifest)
+
+
+def is_current(entry: Optional[Dict], problem: Optional[str], source_version: str) -> bool:
+    """Whether a stored key can be kept without pulling it again."""
+    return entry is not None and problem is None and entry['source_version'] == source_version
+
+
+def get_write_action(in_artifact: bool, entry: Optional[Dict], problem: Optional[str], new_entry: Dict) -> str:
+    """Decides what to do with freshly pulled data for a key that is not current.
+
+    Returns
+    -------
+        ``'write'`` if the key is not in the artifact, ``'keep'`` if the
+        stored data is intact and has the same content hash as the pulled
+        data, and ``'replace'`` otherwise.
+
+    """
+    if not in_artifact:
+        return 'write'
+    if entry is not None and problem is None and entry['hash'] == new_entry['hash']:
+        return 'keep'
+    return 'replace'
+
+
+def adopt(artifact: Artifact, key: str, source_version: str) -> Optional[Dict]:
+    """Builds a manifest entry for a key written before the manifest existed.
+
+    The entry is hashed from the stored data, so nothing is pulled. Returns
+    ``None`` if the stored data cannot be read.
+    """
+    try:
+        columns = _get_stored_draws(artifact.path, key)
+        if columns is not None:
+            entry = make_entry(load_by_draw(artifact.path, key, columns), source_version,
+                               by_draw=True, columns=columns)
+        elif key in artifact:
+            entry = make_entry(artifact.load(key), source_version)
+            artifact.clear_cache()
+        else:
+            return None
+    except Exception as e:
+        logger.warning(f'Could not adopt {key} into the manifest: {e}')
+        return None
+    entry['adopted'] = True
+    return entry
+
+
+def write_keys(artifact: Artifact, keys: Sequence, getters: Mapping[Any, Callable], source_version: str):
+    """Writes each key whose stored data is missing, corrupt or from an old source version."""
+    manifest = load_manifest(artifact)
+    _adopt_unrecorded(artifact, manifest, keys, source_version)
+    problems = find_problems(artifact.path, {str(k): manifest.get(str(k)) for k in keys})
+    for key in keys:
+        entry, problem = manifest.get(str(key)), problems.get(str(key))
+        if is_current(entry, problem, source_version):
+            logger.info(f'{key} found in artifact.')
+            continue
+
+        data = getters[key]()
+        new_entry = make_entry(data, source_version)
+        action = get_write_action(str(key) in artifact, entry, problem, new_entry)
+        if action == 'write':
+            logger.info(f'>>> writing {key}.')
+            artifact.write(str(key), data)
+        elif action == 'keep':
+            logger.info(f'{key} unchanged at {source_version}.')
+        else:
+            logger.info(f'>>> replacing {key} ({problem or "source changed"}).')
+            artifact.replace(str(key), data)
+        manifest[str(key)] = new_entry
+        save_manifest(artifact, manifest)
+
+
+def write_keys_by_draw(artifact: Artifact, keys: Sequence, getters: Mapping[Any, Callable], source_version: str):
+    """Like :func:`write_keys`, but stores each draw column in its own node."""
+    manifest = load_manifest(artifact)
+    _adopt_unrecorded(artifact, manifest, keys, source_version)
+    problems = find_problems(artifact.path, {str(k): manifest.get(str(k)) for k in keys})
+    for key in keys:
+        entry, problem = manifest.get(str(key)), problems.get(str(key))
+        if is_current(entry, problem, source_version):
+            logger.info(f'all draws found for {key}.')
+            continue
+
+        logger.info(f'looking for {key} draw-level data.')
+        data = getters[key]()
+        new_entry = make_entry(data, source_version, by_draw=True, columns=[str(c) for c in data.columns])
+        changed = entry is None or entry.get('stale', False) or entry['hash'] != new_entry['hash']
+        draws_written = []
+        with pd.HDFStore(artifact.path, complevel=9, mode='a') as store:
+            store.put(f'{key.path}/index', data.index.to_frame(index=False))
+            data = data.reset_index(drop=True)
+            for c in data.columns:
+                draw_key = f'{key.path}/{c}'
+                if changed or draw_key not in store:
+                    store.put(draw_key, data[c])
+                    draws_written.append(c)
+        if draws_written:
+            logger.info(f">>> wrote data for draws [{' '.join(draws_written)}] under {key}.")
+        else:
+            logger.info(f"all draws found for {key}.")
+        manifest[str(key)] = new_entry
+        save_manifest(artifact, manifest)
+
+
+def _adopt_unrecorded(artifact: Artifact, manifest: Dict[str, Dict], keys: Sequence, source_version: str):
+    adopted = False
+    for key in keys:
+        if str(key) not in manifest:
+            entry = adopt(artifact, str(key), source_version)
+            if entry is not None:
+                logger.info(f'{key} adopted into the manifest.')
+                manifest[str(key)] = entry
+                adopted = True
+    if adopted:
+        save_manifest(artifact, manifest)
+
+
+def _get_stored_draws(path: str, key: str) -> Optional[List[str]]:
+    """Lists the draw nodes of a key written draw by draw, in draw order."""
+    key = EntityKey(key)
+    with pd.HDFStore(str(path), mode='r') as store:
+        node = store.get_node(key.path)
+        if node is None or store.get_node(f'{key.path}/index') is None:
+            return None
+        draws = [name for name in node._v_children if name != 'index']
+    return sorted(draws, key=lambda d: int(d.split('_')[-1]) if d.split('_')[-1].isdigit() else -1)
+
+
+def find_problems(path: str, entries: Mapping[str, Optional[Dict]]) -> Dict[str, str]:
+    """Checks keys in the artifact at ``path`` against their manifest entries.
+
+    Only node presence, row counts and draw nodes are checked, so no table
+    is read into memory.
+
+    Parameters
+    ----------
+    path
+        Path to the artifact hdf file.
+    entries
+        Mapping between artifact keys and their manifest entries. An entry
+        of ``None`` means the key is not in the manifest.
+
+    Returns
+    -------
+        A mapping between keys that failed a check and a description of the
+        problem.
+
+    """
+    problems = {}
+    with pd.HDFStore(str(path), mode='r') as store:
+        for key, entry in entries.items():
+            problem = _find_problem(store, EntityKey(key), entry)
+            if problem is not None:
+                problems[key] = problem
+    return problems
+
+
+def _find_problem(store: pd.HDFStore, key: EntityKey, entry: Optional[Dict]) -> Optional[str]:
+    if entry is None:
+        return 'not in manifest'
+    if entry.get('stale', False):
+        return 'marked stale'
+    if store.get_node(key.path) is None:
+        return 'missing from artifact'
+    if entry['shape'] is None:
+        return None
+
+    table_paths = [key.path]
+    if entry.get('by_draw'):
+        missing = [c for c in entry['columns'] if store.get_node(f'{key.path}/{c}') is None]
+        if missing:
+            return f"missing draws [{' '.join(missing)}]"
+        table_paths = [f'{key.path}/{c}' for c in entry['columns']]
+
+    for table_path in table_paths:
+        try:
+            rows = int(np.atleast_1d(store.get_storer(table_path).shape)[0])
+        except Exception:
+            return f'unreadable node {table_path}'
+        if rows != entry['shape'][0]:
+            return f"expected {entry['shape'][0]} rows in {table_path}, found {rows}"
+    return None
+
+
+def load_by_draw(path: str, key: str, columns: list) -> pd.DataFrame:
+    """Reassembles data written draw by draw by the builder."""
+    key = EntityKey(key)
+    with pd.HDFStore(str(path), mode='r') as store:
+        index = pd.MultiIndex.from_frame(store.get(f'{key.path}/index'))
+        data = pd.concat([store.get(f'{key.path}/{c}') for c in columns], axis=1)
+    data.columns = columns
+    data.index = index
+    return data
+
+
+def verify_artifact(path: str, full: bool = False) -> Dict[str, str]:
+    """Checks the artifact at ``path`` against its manifest.
+
+    Parameters
+    ----------
+    path
+        Path to the artifact hdf file.
+    full
+        Whether to also load every key and compare its content hash to
+        the manifest. This reads the full tables and is slow.
+
+    Returns
+    -------
+        A mapping between keys that failed a check and a description of the
+        problem.
+
+    """
+    if not Path(path).is_file():
+        return {str(path): 'artifact file not found'}
+
+    artifact = Artifact(path)
+    manifest = load_manifest(artifact)
+    if not manifest:
+        return {str(MANIFEST_KEY): 'missing from artifact'}
+
+    problems = find_problems(path, manifest)
+    if full:
+        intact = {key: entry for key, entry in manifest.items() if key not in problems}
+        problems.update(find_hash_mismatches(artifact, intact))
+    return problems
+
+
+def mark_mismatched_stale(path: str) -> Dict[str, str]:
+    """Flags keys whose content hash does not match, and adopted keys, as stale.
+
+    Returns
+    -------
+        A mapping between the flagged keys and why they were flagged.
+
+    """
+    artifact = Artifact(path)
+    manifest = load_manifest(artifact)
+    problems = find_problems(path, manifest)
+    intact = {key: entry for key, entry in manifest.items() if key not in problems}
+    stale = find_hash_mismatches(artifact, intact)
+    stale.update({key: 'adopted without pulling' for key, entry in intact.items()
+                  if entry.get('adopted', False) and key not in stale})
+    mark_stale(artifact, list(stale))
+    return stale
+
+
+def find_hash_mismatches(artifact: Artifact, entries: Mapping[str, Dict]) -> Dict[str, str]:
+    """Loads each key and compares its content hash to its manifest entry.
+
+    Keys are expected to pass :func:`find_problems`. This reads the full
+    tables and is slow.
+    """
+    problems = {}
+    for key, entry in entries.items():
+        if entry.get('by_draw'):
+            data = load_by_draw(artifact.path, key, entry['columns'])
+        else:
+            data = artifact.load(key)
+            artifact.clear_cache()
+        if hash_data(data) != entry['hash']:
+            problems[key] = 'content hash does not match manifest'
+    return problems
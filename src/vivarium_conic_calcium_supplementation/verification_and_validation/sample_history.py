@@ -0,0 +1,82 @@
+"""Reader for the sample histories written by the ``SampleHistoryObserver``.
+
+Histories are stored as a row oriented PyTables table with indexes on
+``simulant``, ``time`` and the treatment status. Row selections are
+resolved against those indexes, so only matching rows are read from disk.
+Column selection happens after the rows are read, since each row stores
+all value columns together; it saves memory in the result, not disk reads.
+"""
+from typing import List, Optional, Sequence, Union
+
+import pandas as pd
+
+
+SAMPLE_HISTORY_KEY = 'histories'
+TREATMENT_STATUS_COLUMN = 'calcium_supplementation_treatment_status'
+
+Time = Union[str, pd.Timestamp]
+
+
+def get_sample_history_columns(path: str) -> List[str]:
+    """Lists the columns available in a sample history file."""
+    with pd.HDFStore(path, mode='r') as store:
+        return list(store.select(SAMPLE_HISTORY_KEY, stop=0).columns)
+
+
+def load_sample_history(path: str,
+                        simulants: Optional[Sequence[int]] = None,
+                        start: Optional[Time] = None,
+                        end: Optional[Time] = None,
+                        treatment_status: Optional[str] = None,
+                        columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Loads a slice of a sample history file.
+
+    Parameters
+    ----------
+    path
+        Path to a sample history hdf file.
+    simulants
+        Simulant ids to select. All simulants if not provided.
+    start
+        Earliest time to select, inclusive.
+    end
+        Latest time to select, exclusive.
+    treatment_status
+        Calcium supplementation treatment status to select,
+        e.g. ``'treated'``.
+    columns
+        Columns to read. All columns if not provided.
+
+    Returns
+    -------
+        The selected rows and columns, indexed by simulant and time.
+
+    Examples
+    --------
+    >>> load_sample_history(path, simulants=[3, 14], start='2021-01-01',
+    ...                     columns=['alive', 'cause_of_death'])
+
+    """
+    # Terms refer to the local variables below and are evaluated by pytables.
+    where = []
+    if simulants is not None:
+        simulants = list(simulants)
+        if not simulants:
+            where.append('simulant<0')
+        else:
+            # pandas filters lists of more than 31 values in memory after reading,
+            # so bound the simulants to let the index narrow the rows read first.
+            first_simulant, last_simulant = min(simulants), max(simulants)
+            where.extend(['simulant=simulants', 'simulant>=first_simulant', 'simulant<=last_simulant'])
+    if start is not None:
+        start = pd.Timestamp(start)
+        where.append('time>=start')
+    if end is not None:
+        end = pd.Timestamp(end)
+        where.append('time<end')
+    if treatment_status is not None:
+        where.append(f'{TREATMENT_STATUS_COLUMN}=treatment_status')
+
+    with pd.HDFStore(path, mode='r') as store:
+        return store.select(SAMPLE_HISTORY_KEY, where=where or None,
+                            columns=list(columns) if columns is not None else None)
@@ -0,0 +1,210 @@
+import os
+import shutil
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium.config_tree import ConfigTree
+from vivarium.framework.artifact import Artifact, ArtifactManager
+
+from vivarium_conic_calcium_supplementation.components import artifact_cache as ac
+
+KEY = 'cause.diarrheal_diseases.incidence_rate'
+
+
+def make_data():
+    index = pd.MultiIndex.from_product([['Mali'], ['Male', 'Female'], [0.0, 0.5]],
+                                       names=['location', 'sex', 'age_group_start'])
+    return pd.DataFrame({'draw_0': np.arange(4, dtype=float), 'draw_1': np.ones(4)}, index=index)
+
+
+@pytest.mark.parametrize('data', [
+    make_data(),
+    pd.DataFrame({'value': [1.5, np.nan], 'year_start': pd.to_datetime(['2020-01-01', None]),
+                  'count': np.array([1, 2], dtype=np.int64)}),
+    pd.DataFrame({'parameter': ['cat1', 'cat2']}, index=pd.Index(['Mali', 'Mali'], name='location')),
+    pd.DataFrame({'parameter': pd.Categorical(['cat1', 'cat2', 'cat10'],
+                                              categories=['cat1', 'cat2', 'cat10', 'cat99'], ordered=True)}),
+    ['Mali'],
+    {'a': 1, 'b': [1, 2]},
+])
+def test_round_trip(tmp_path, data):
+    ac.write(data, tmp_path / 'entry')
+    cached = ac.attach(tmp_path / 'entry')
+
+    assert cached is not None
+    assert ac._same(data, cached)
+    if isinstance(data, pd.DataFrame):
+        pd.testing.assert_frame_equal(cached, data)
+
+
+@pytest.mark.parametrize('values', [['a', None], ['a', np.nan], ['a', 1]])
+def test_unrepresentable_data_is_uncached(tmp_path, values):
+    data = pd.DataFrame({'parameter': np.array(values, dtype=object)})
+    ac.write(data, tmp_path / 'entry')
+    assert ac.attach(tmp_path / 'entry') is None
+
+
+def test_cache_matches_artifact(tmp_path):
+    data = make_data()
+    artifact_path = tmp_path / 'mali.hdf'
+    Artifact(str(artifact_path)).write(KEY, data)
+    Artifact(str(artifact_path)).write('metadata.locations', ['Mali'])
+    root = tmp_path / 'cache' / 'fingerprint'
+
+    for _ in range(2):
+        cache = ac.ArtifactCache(Artifact(str(artifact_path)), root)
+        pd.testing.assert_frame_equal(cache.load(KEY), data)
+        assert cache.load('metadata.locations') == ['Mali']
+        assert KEY in cache
+    assert (root / KEY).is_dir()
+
+
+def test_uncached_key_falls_back_to_artifact(tmp_path):
+    data = pd.DataFrame({'parameter': np.array(['a', None], dtype=object)})
+    artifact_path = tmp_path / 'mali.hdf'
+    Artifact(str(artifact_path)).write(KEY, data)
+
+    cache = ac.ArtifactCache(Artifact(str(artifact_path)), tmp_path / 'cache' / 'fingerprint')
+
+    pd.testing.assert_frame_equal(cache.load(KEY), Artifact(str(artifact_path)).load(KEY))
+
+
+def test_get_fingerprint(tmp_path):
+    artifact_path = tmp_path / 'mali.hdf'
+    Artifact(str(artifact_path)).write(KEY, make_data())
+    fingerprint = ac.get_fingerprint(artifact_path, 0, 'Mali', None)
+
+    assert fingerprint == ac.get_fingerprint(artifact_path, 0, 'Mali', None)
+    assert fingerprint != ac.get_fingerprint(artifact_path, 1, 'Mali', None)
+    os.utime(artifact_path, ns=(0, 0))
+    assert fingerprint != ac.get_fingerprint(artifact_path, 0, 'Mali', None)
+
+
+def test_evict(tmp_path):
+    old, recent, current = (tmp_path / name for name in ['old', 'recent', 'current'])
+    for root in [old, recent, current]:
+        root.mkdir()
+        (root / ac.LAST_USED).touch()
+    stale = time.time() - 3600
+    os.utime(old / ac.LAST_USED, (stale, stale))
+    os.utime(current / ac.LAST_USED, (stale, stale))
+
+    ac.evict(tmp_path, max_age=60, keep='current')
+
+    assert not old.exists()
+    assert recent.exists()
+    assert current.exists()
+
+
+def test_evict_roots_without_marker(tmp_path):
+    old, new = tmp_path / 'old', tmp_path / 'new'
+    old.mkdir()
+    new.mkdir()
+    stale = time.time() - 3600
+    os.utime(old, (stale, stale))
+
+    ac.evict(tmp_path, max_age=60, keep='current')
+
+    assert not old.exists()
+    assert new.exists()
+
+
+def test_root_evicted_while_marking_use(tmp_path, monkeypatch):
+    root = tmp_path / 'cache' / 'fingerprint'
+    lock, evictions = ac.lock, []
+
+    def evict_first(path, *args, **kwargs):
+        # Stands in for another process evicting the root before the lock is taken.
+        if not evictions:
+            evictions.append(path)
+            shutil.rmtree(path)
+        return lock(path, *args, **kwargs)
+
+    monkeypatch.setattr(ac, 'lock', evict_first)
+    ac.ArtifactCache(None, root)
+
+    assert evictions == [root]
+    assert (root / ac.LAST_USED).exists()
+
+
+def test_failed_fill_falls_back_to_artifact(tmp_path, monkeypatch):
+    artifact_path = tmp_path / 'mali.hdf'
+    Artifact(str(artifact_path)).write(KEY, make_data())
+    root = tmp_path / 'cache' / 'fingerprint'
+    cache = ac.ArtifactCache(Artifact(str(artifact_path)), root)
+
+    def write(data, entry):
+        entry.mkdir(parents=True)
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(ac, 'write', write)
+
+    pd.testing.assert_frame_equal(cache.load(KEY), make_data())
+    assert not (root / KEY).exists()
+    assert not list(root.glob('*.tmp'))
+
+
+def test_remove_abandoned_fills(tmp_path):
+    live = tmp_path / f'{KEY}.{os.getpid()}.tmp'
+    # Pids are capped well below this on linux, so no process owns it.
+    dead = tmp_path / f'{KEY}.{2 ** 31 - 1}.tmp'
+    live.mkdir()
+    dead.mkdir()
+
+    ac.remove_abandoned_fills(tmp_path)
+
+    assert live.exists()
+    assert not dead.exists()
+
+
+def make_builder(tmp_path, artifact_path):
+    configuration = ConfigTree(layers=['base', 'override'])
+    configuration.update(ac.CachedArtifactManager.configuration_defaults, layer='base')
+    configuration.update({'input_data': {'artifact_path': artifact_path,
+                                         'input_draw_number': 0,
+                                         'location': 'Mali',
+                                         'cache_dir': str(tmp_path / 'cache')}}, layer='override')
+    lifecycle = SimpleNamespace(add_constraint=lambda *args, **kwargs: None)
+    return SimpleNamespace(configuration=configuration, lifecycle=lifecycle)
+
+
+def test_manager_without_artifact(tmp_path):
+    manager = ac.CachedArtifactManager()
+    manager.setup(make_builder(tmp_path, None))
+
+    assert manager.artifact is None
+    assert not (tmp_path / 'cache').exists()
+
+
+def test_manager_with_artifact(tmp_path):
+    artifact_path = tmp_path / 'mali.hdf'
+    Artifact(str(artifact_path)).write(KEY, make_data())
+
+    builder = make_builder(tmp_path, str(artifact_path))
+    default = ArtifactManager()
+    default.setup(builder)
+    manager = ac.CachedArtifactManager()
+    manager.setup(builder)
+
+    assert isinstance(manager.artifact, ac.ArtifactCache)
+    pd.testing.assert_frame_equal(manager.load(KEY), default.load(KEY))
+
+
+def test_manager_with_unusable_cache_dir(tmp_path):
+    artifact_path = tmp_path / 'mali.hdf'
+    Artifact(str(artifact_path)).write(KEY, make_data())
+    builder = make_builder(tmp_path, str(artifact_path))
+    # A file where the cache directory should be makes every cache write fail.
+    (tmp_path / 'cache').write_text('')
+
+    default = ArtifactManager()
+    default.setup(builder)
+    manager = ac.CachedArtifactManager()
+    manager.setup(builder)
+
+    assert isinstance(manager.artifact, Artifact)
+    pd.testing.assert_frame_equal(manager.load(KEY), default.load(KEY))
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats
+
+from vivarium.framework.randomness import RandomnessStream
+
+from vivarium_conic_calcium_supplementation.components.intervention import (CalciumSupplementationIntervention,
+                                                                            get_population_effect_seeds,
+                                                                            sample_individual_effect_sizes,
+                                                                            sample_population_effect_sizes)
+
+START_TIME = pd.Timestamp('2020-01-01')
+RANDOM_SEED = 3
+
+
+def get_effect_stream(input_draw):
+    # Seeded the way the randomness manager seeds streams under psimulate.
+    return RandomnessStream('effect_draw', lambda: START_TIME, f'{RANDOM_SEED}{input_draw}')
+
+
+def scalar_population_effect_size(stream, mean, sd, key):
+    r = np.random.RandomState(stream.get_seed(additional_key=key))
+    draw = r.uniform()
+    # vivarium raises on floating point errors, but a degenerate scipy distribution evaluates to nan.
+    with np.errstate(all='ignore'):
+        effect = scipy.stats.norm(mean, sd).ppf(draw)
+    effect = effect if effect > 0.0 else 0.0
+    return effect
+
+
+def scalar_individual_effect_size(draw, mean, sd):
+    if sd > 0:
+        effect_size = np.asarray(scipy.stats.norm(mean, sd).ppf(draw))
+        effect_size[effect_size < 0] = 0.0
+    else:
+        effect_size = mean
+    return effect_size
+
+
+@pytest.fixture
+def intervention():
+    component = CalciumSupplementationIntervention()
+    component.effect_randomness = get_effect_stream(input_draw=7)
+    return component
+
+
+def test_get_population_effect_seeds():
+    input_draws = [0, 7, 21, 999]
+    seeds = get_population_effect_seeds('population_birth_weight', START_TIME, RANDOM_SEED, input_draws)
+    expected = [get_effect_stream(d).get_seed(additional_key='population_birth_weight') for d in input_draws]
+    assert seeds == expected
+    assert len(set(seeds)) == len(input_draws)
+
+
+@pytest.mark.parametrize('mean, sd', [(100, 30), (0.5, 0.25), (5, 0), (-5, 1)])
+def test_sample_population_effect_sizes_matches_scalar_path(mean, sd):
+    input_draws = [0, 1, 2, 3]
+    seeds = get_population_effect_seeds('population_birth_weight', START_TIME, RANDOM_SEED, input_draws)
+
+    effects = sample_population_effect_sizes(seeds, mean, sd)
+
+    assert effects.shape == (len(input_draws), 1)
+    for i, draw in enumerate(input_draws):
+        expected = scalar_population_effect_size(get_effect_stream(draw), mean, sd, 'population_birth_weight')
+        assert effects[i, 0] == expected
+
+
+def test_sample_population_effect_sizes_parameter_grid():
+    seeds = get_population_effect_seeds('population_gestation_time', START_TIME, RANDOM_SEED, range(5))
+    means, sds = np.array([0.4, 0.5, 0.6]), np.array([0.1, 0.25, 0.0])
+
+    effects = sample_population_effect_sizes(seeds, means, sds)
+
+    assert effects.shape == (5, 3)
+    for i, draw in enumerate(range(5)):
+        for j, (mean, sd) in enumerate(zip(means, sds)):
+            stream = get_effect_stream(draw)
+            assert effects[i, j] == scalar_population_effect_size(stream, mean, sd, 'population_gestation_time')
+
+
+@pytest.mark.parametrize('sd', [30, 0])
+def test_sample_individual_effect_sizes_matches_scalar_path(sd):
+    draws = np.random.RandomState(0).uniform(size=1000)
+    population_effects = np.array([0.0, 20.0, 101.2])
+
+    effects = sample_individual_effect_sizes(draws, population_effects, sd)
+
+    assert effects.shape == (3, 1000)
+    for i, mean in enumerate(population_effects):
+        expected = np.broadcast_to(scalar_individual_effect_size(draws, mean, sd), draws.shape)
+        assert np.array_equal(effects[i], expected)
+
+
+def test_component_uses_batch_sampling(intervention):
+    stream = intervention.effect_randomness
+    effect = intervention.get_population_effect_size(101.1873, 24.33824, 'population_birth_weight')
+    assert effect == scalar_population_effect_size(stream, 101.1873, 24.33824, 'population_birth_weight')
+
+    index = pd.RangeIndex(100)
+    individual = intervention.get_individual_effect_size(index, effect, 30, 'individual_birth_weight')
+    draw = stream.get_draw(index, additional_key='individual_birth_weight')
+    assert individual.index.equals(index)
+    assert np.array_equal(individual.values, scalar_individual_effect_size(draw, effect, 30))
+
+
+@pytest.mark.parametrize('population_shape', [(3,), (3, 2)])
+def test_sample_individual_effect_sizes_per_input_draw(population_shape):
+    draws = np.random.RandomState(0).uniform(size=(3, 500))
+    population_effects = np.arange(np.prod(population_shape), dtype=float).reshape(population_shape) * 10
+
+    effects = sample_individual_effect_sizes(draws, population_effects, 30)
+
+    assert effects.shape == population_shape + (500,)
+    for index in np.ndindex(*population_shape):
+        expected = scalar_individual_effect_size(draws[index[0]], population_effects[index], 30)
+        assert np.array_equal(effects[index], expected)
+
+
+@pytest.mark.parametrize('draws, population_effects', [
+    (np.zeros((3, 10)), np.zeros(4)),
+    (np.zeros((3, 10)), 5.0),
+    (np.zeros((3, 3, 10)), np.zeros(3)),
+])
+def test_sample_individual_effect_sizes_rejects_misaligned_draws(draws, population_effects):
+    with pytest.raises(ValueError):
+        sample_individual_effect_sizes(draws, population_effects, 30)
@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium.framework.artifact import Artifact, EntityKey
+
+from vivarium_conic_calcium_supplementation.tools import manifest as mf
+
+KEY = EntityKey('cause.diarrheal_diseases.incidence_rate')
+KEY_NAME = str(KEY)
+RR_KEY = EntityKey('risk_factor.low_birth_weight_and_short_gestation.relative_risk')
+RR_KEY_NAME = str(RR_KEY)
+
+
+def make_data(value=1.0, rows=4):
+    index = pd.MultiIndex.from_product([['Mali'], ['Male', 'Female'], range(rows // 2)],
+                                       names=['location', 'sex', 'age_group_start'])
+    return pd.DataFrame({'draw_0': value * np.arange(rows), 'draw_1': value * np.ones(rows)}, index=index)
+
+
+class Getter:
+    def __init__(self, data):
+        self.data = data
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.data
+
+
+@pytest.fixture
+def artifact_path(tmp_path):
+    return str(tmp_path / 'mali.hdf')
+
+
+def test_hash_data():
+    data = make_data()
+    assert mf.hash_data(data) == mf.hash_data(make_data())
+    assert mf.hash_data(data) != mf.hash_data(make_data(value=2.0))
+    assert mf.hash_data(data) != mf.hash_data(data.rename(columns={'draw_1': 'draw_2'}))
+    assert mf.hash_data({'a': 1, 'b': [1, 2]}) == mf.hash_data({'b': [1, 2], 'a': 1})
+    assert mf.hash_data(['Mali']) != mf.hash_data(['Nigeria'])
+
+
+def test_make_entry():
+    entry = mf.make_entry(make_data(), 'v1', by_draw=True)
+    assert entry['shape'] == [4, 2]
+    assert entry['source_version'] == 'v1'
+    assert entry['by_draw']
+    assert mf.make_entry(['Mali'], 'v1')['shape'] is None
+
+
+@pytest.mark.parametrize('entry, problem, source_version, expected', [
+    (None, None, 'v1', False),
+    ({'source_version': 'v1'}, None, 'v1', True),
+    ({'source_version': 'v1'}, 'missing from artifact', 'v1', False),
+    ({'source_version': 'v1'}, None, 'v2', False),
+])
+def test_is_current(entry, problem, source_version, expected):
+    assert mf.is_current(entry, problem, source_version) == expected
+
+
+@pytest.mark.parametrize('in_artifact, entry, problem, new_hash, expected', [
+    (False, None, None, 'a', 'write'),
+    (True, None, 'not in manifest', 'a', 'replace'),
+    (True, {'hash': 'a'}, 'expected 4 rows, found 1', 'a', 'replace'),
+    (True, {'hash': 'a'}, None, 'a', 'keep'),
+    (True, {'hash': 'a'}, None, 'b', 'replace'),
+])
+def test_get_write_action(in_artifact, entry, problem, new_hash, expected):
+    assert mf.get_write_action(in_artifact, entry, problem, {'hash': new_hash}) == expected
+
+
+def test_find_problems(artifact_path):
+    artifact = Artifact(artifact_path)
+    data = make_data()
+    artifact.write(KEY_NAME, data)
+    entry = mf.make_entry(data, 'v1')
+
+    assert mf.find_problems(artifact_path, {KEY_NAME: entry}) == {}
+    assert mf.find_problems(artifact_path, {KEY_NAME: None}) == {KEY_NAME: 'not in manifest'}
+    assert 'missing' in mf.find_problems(artifact_path, {'cause.measles.incidence_rate': entry})[
+        'cause.measles.incidence_rate']
+    assert 'rows' in mf.find_problems(artifact_path, {KEY_NAME: mf.make_entry(make_data(rows=6), 'v1')})[KEY_NAME]
+
+
+def test_write_keys_missing_then_current(artifact_path):
+    getter = Getter(make_data())
+
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+
+    assert getter.calls == 1
+    artifact = Artifact(artifact_path)
+    pd.testing.assert_frame_equal(artifact.load(KEY_NAME), make_data())
+    assert mf.load_manifest(artifact)[KEY_NAME]['hash'] == mf.hash_data(make_data())
+
+
+def test_write_keys_replaces_corrupt_data(artifact_path):
+    getter = Getter(make_data())
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+    Artifact(artifact_path).replace(KEY_NAME, make_data().iloc[:1])
+
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+
+    assert getter.calls == 2
+    pd.testing.assert_frame_equal(Artifact(artifact_path).load(KEY_NAME), make_data())
+
+
+def test_write_keys_source_changed_same_hash(artifact_path):
+    getter = Getter(make_data())
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+
+    artifact = Artifact(artifact_path)
+    replaced = []
+    replace = artifact.replace
+    artifact.replace = lambda key, data: replaced.append(key) or replace(key, data)
+    mf.write_keys(artifact, [KEY], {KEY: getter}, 'v2')
+
+    assert getter.calls == 2
+    assert KEY_NAME not in replaced
+    assert mf.load_manifest(Artifact(artifact_path))[KEY_NAME]['source_version'] == 'v2'
+
+
+def test_write_keys_source_changed_new_hash(artifact_path):
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: Getter(make_data())}, 'v1')
+
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: Getter(make_data(value=2.0))}, 'v2')
+
+    artifact = Artifact(artifact_path)
+    pd.testing.assert_frame_equal(artifact.load(KEY_NAME), make_data(value=2.0))
+    assert mf.load_manifest(artifact)[KEY_NAME]['hash'] == mf.hash_data(make_data(value=2.0))
+
+
+def test_write_keys_adopts_existing_data(artifact_path):
+    Artifact(artifact_path).write(KEY_NAME, make_data())
+    getter = Getter(make_data(value=2.0))
+
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+
+    assert getter.calls == 0
+    entry = mf.load_manifest(Artifact(artifact_path))[KEY_NAME]
+    assert entry['adopted']
+    assert entry['hash'] == mf.hash_data(make_data())
+
+
+def test_write_keys_by_draw(artifact_path):
+    getter = Getter(make_data())
+    mf.write_keys_by_draw(Artifact(artifact_path), [RR_KEY], {RR_KEY: getter}, 'v1')
+    assert mf.verify_artifact(artifact_path, full=True) == {}
+
+    with pd.HDFStore(artifact_path, mode='a') as store:
+        store.remove(f'{RR_KEY.path}/draw_1')
+    assert 'draw_1' in mf.verify_artifact(artifact_path)[RR_KEY_NAME]
+
+    mf.write_keys_by_draw(Artifact(artifact_path), [RR_KEY], {RR_KEY: getter}, 'v1')
+    assert getter.calls == 2
+    assert mf.verify_artifact(artifact_path, full=True) == {}
+
+
+def test_write_keys_by_draw_adopts_existing_data(artifact_path):
+    getter = Getter(make_data())
+    mf.write_keys_by_draw(Artifact(artifact_path), [RR_KEY], {RR_KEY: getter}, 'v1')
+    artifact = Artifact(artifact_path)
+    mf.save_manifest(artifact, {})
+
+    mf.write_keys_by_draw(Artifact(artifact_path), [RR_KEY], {RR_KEY: getter}, 'v1')
+
+    assert getter.calls == 1
+    assert mf.load_manifest(Artifact(artifact_path))[RR_KEY_NAME]['adopted']
+
+
+def test_verify_artifact_missing_file(tmp_path):
+    path = tmp_path / 'nowhere.hdf'
+    assert mf.verify_artifact(str(path)) == {str(path): 'artifact file not found'}
+    assert not path.exists()
+
+
+def test_verify_artifact_full_detects_changed_content(artifact_path):
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: Getter(make_data())}, 'v1')
+    assert mf.verify_artifact(artifact_path, full=True) == {}
+
+    Artifact(artifact_path).replace(KEY_NAME, make_data(value=3.0))
+
+    assert mf.verify_artifact(artifact_path) == {}
+    assert mf.verify_artifact(artifact_path, full=True) == {KEY_NAME: 'content hash does not match manifest'}
+
+
+def test_rebuild_after_full_check_repairs_same_shape_corruption(artifact_path):
+    getter = Getter(make_data())
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+    Artifact(artifact_path).replace(KEY_NAME, make_data(value=3.0))
+
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+    assert getter.calls == 1
+
+    assert mf.mark_mismatched_stale(artifact_path) == {KEY_NAME: 'content hash does not match manifest'}
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+
+    assert getter.calls == 2
+    pd.testing.assert_frame_equal(Artifact(artifact_path).load(KEY_NAME), make_data())
+    assert mf.verify_artifact(artifact_path, full=True) == {}
+    assert mf.mark_mismatched_stale(artifact_path) == {}
+
+
+def test_rebuild_after_full_check_repairs_same_shape_corrupt_draws(artifact_path):
+    getter = Getter(make_data())
+    mf.write_keys_by_draw(Artifact(artifact_path), [RR_KEY], {RR_KEY: getter}, 'v1')
+    with pd.HDFStore(artifact_path, mode='a') as store:
+        store.put(f'{RR_KEY.path}/draw_1', pd.Series(np.zeros(4)))
+
+    assert RR_KEY_NAME in mf.mark_mismatched_stale(artifact_path)
+    mf.write_keys_by_draw(Artifact(artifact_path), [RR_KEY], {RR_KEY: getter}, 'v1')
+
+    assert getter.calls == 2
+    assert mf.verify_artifact(artifact_path, full=True) == {}
+
+
+def test_rebuild_after_full_check_refreshes_adopted_data(artifact_path):
+    Artifact(artifact_path).write(KEY_NAME, make_data())
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: Getter(make_data())}, 'v1')
+    getter = Getter(make_data(value=2.0))
+
+    assert mf.mark_mismatched_stale(artifact_path) == {KEY_NAME: 'adopted without pulling'}
+    assert mf.verify_artifact(artifact_path) == {KEY_NAME: 'marked stale'}
+    mf.write_keys(Artifact(artifact_path), [KEY], {KEY: getter}, 'v1')
+
+    assert getter.calls == 1
+    pd.testing.assert_frame_equal(Artifact(artifact_path).load(KEY_NAME), make_data(value=2.0))
+    assert 'adopted' not in mf.load_manifest(Artifact(artifact_path))[KEY_NAME]
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vivarium_conic_calcium_supplementation.components import SampleHistoryObserver
+from vivarium_conic_calcium_supplementation.verification_and_validation.sample_history import (
+    get_sample_history_columns, load_sample_history)
+
+N_SIMULANTS = 60
+TIMES = pd.date_range('2020-01-01', periods=5, freq='D')
+
+
+def make_snapshot(time):
+    index = pd.Index(range(N_SIMULANTS), name='simulant')
+    record = pd.DataFrame({'alive': np.full(N_SIMULANTS, 'alive', dtype=object),
+                           'age': np.arange(N_SIMULANTS) / 365 + (time - TIMES[0]).days,
+                           'sex': pd.Categorical(np.where(index % 2, 'Male', 'Female')),
+                           'calcium_supplementation_treatment_status':
+                               np.where(index % 3, 'not_treated', 'treated').astype(object),
+                           'exit_time': pd.NaT}, index=index)
+    record['time'] = time
+    return record.set_index('time', append=True)
+
+
+@pytest.fixture
+def history(tmp_path):
+    observer = SampleHistoryObserver()
+    observer.sample_history_parameters = SimpleNamespace(path=str(tmp_path / 'sample_history.hdf'))
+    observer.history_snapshots = [make_snapshot(t) for t in TIMES]
+    observer.dump(event=None)
+    return observer.sample_history_parameters.path, pd.concat(observer.history_snapshots)
+
+
+def test_load_full_history(history):
+    path, expected = history
+    pd.testing.assert_frame_equal(load_sample_history(path), expected)
+    assert get_sample_history_columns(path) == list(expected.columns)
+
+
+@pytest.mark.parametrize('simulants', [[3], [5, 1, 40], list(range(0, N_SIMULANTS, 2))])
+def test_load_by_simulant(history, simulants):
+    path, expected = history
+    result = load_sample_history(path, simulants=simulants)
+    expected = expected[expected.index.get_level_values('simulant').isin(simulants)]
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_load_no_simulants(history):
+    path, expected = history
+    result = load_sample_history(path, simulants=[])
+    assert result.empty
+    assert list(result.columns) == list(expected.columns)
+
+
+def test_load_by_time_status_and_columns(history):
+    path, expected = history
+    result = load_sample_history(path, start='2020-01-02', end=TIMES[4], treatment_status='treated',
+                                 columns=['age', 'sex'])
+
+    time = expected.index.get_level_values('time')
+    mask = (time >= TIMES[1]) & (time < TIMES[4])
+    mask &= expected['calcium_supplementation_treatment_status'] == 'treated'
+    pd.testing.assert_frame_equal(result, expected.loc[mask, ['age', 'sex']])